@@ -13,13 +13,22 @@ photo_editor.py — Production-ready CLI для массовой обработ
 from __future__ import annotations
 
 import argparse
+import io
+import multiprocessing
 import os
+import queue
+import shutil
 import sys
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Callable, Optional, Tuple
 
-from PIL import Image
+from PIL import Image, features
+from PIL import __version__ as PILLOW_VERSION
 
 # ─── Константы ────────────────────────────────────────────────────────────────
 
@@ -32,19 +41,97 @@ FORMAT_MAP: dict[str, str] = {
     "webp": "WEBP",
 }
 
+# Предвычисленные таблицы: один dict-lookup вместо цепочки
+# .lower()/.lstrip()/f-string на каждый файл батча
+_SUFFIX_INFO: dict[str, tuple[str, str]] = {
+    ".jpg": ("JPEG", ".jpg"),
+    ".jpeg": ("JPEG", ".jpeg"),
+    ".png": ("PNG", ".png"),
+    ".webp": ("WEBP", ".webp"),
+}
+
+_FORMAT_EXT: dict[str, str] = {
+    "jpeg": ".jpeg",
+    "jpg": ".jpeg",
+    "png": ".png",
+    "webp": ".webp",
+}
+
 DEFAULT_QUALITY: int = 85
 
+# Фильтры ресайза: LANCZOS — самый качественный, но и самый медленный
+# (6-tap свёртка); BICUBIC (4-tap) ~1.5× быстрее при почти том же качестве
+FILTER_MAP: dict[str, int] = {
+    "lanczos": Image.LANCZOS,
+    "bicubic": Image.BICUBIC,
+    "bilinear": Image.BILINEAR,
+    "hamming": Image.HAMMING,
+}
+
+
+@dataclass(frozen=True)
+class SaveOptions:
+    """
+    Инвариантные для всего батча параметры обработки.
+
+    Собираются один раз в main() и передаются воркерам, чтобы не пересобирать
+    словари/не перевычислять одно и то же на каждый файл.
+    """
+    width: Optional[int] = None
+    height: Optional[int] = None
+    max_side: Optional[int] = None
+    out_format: Optional[str] = None
+    # None = «качество не задавали»: при энкоде берётся DEFAULT_QUALITY,
+    # а файлы без реальной работы можно копировать как есть (passthrough)
+    quality: Optional[int] = None
+    do_crop_center: bool = False
+    resample: int = Image.LANCZOS
+    lossless: bool = False
+    jpeg_optimize: bool = False
+    jpeg_progressive: bool = False
+    gamma: Optional[float] = None
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "SaveOptions":
+        return cls(
+            width=args.width,
+            height=args.height,
+            max_side=args.max_side,
+            out_format=args.out_format,
+            quality=args.quality,
+            do_crop_center=args.crop_center,
+            resample=FILTER_MAP[args.resample_filter],
+            lossless=args.lossless,
+            jpeg_optimize=args.jpeg_optimize,
+            jpeg_progressive=args.jpeg_progressive,
+            gamma=args.gamma,
+        )
+
 
 # ─── Утилиты ─────────────────────────────────────────────────────────────────
 
 def collect_images(input_dir: Path) -> list[Path]:
     """Собирает все поддерживаемые изображения из директории (не рекурсивно)."""
-    return sorted(
-        p for p in input_dir.iterdir()
-        if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS
-    )
-
-
+    # os.scandir отдаёт DirEntry с закэшированным is_file() — в отличие от
+    # iterdir() не делает лишний stat() на каждый файл, что заметно на
+    # директориях с тысячами изображений
+    with os.scandir(input_dir) as it:
+        names = [
+            entry.name for entry in it
+            if entry.is_file()
+            and os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS
+        ]
+    # Сортируем голые строки и только потом заворачиваем в Path:
+    # сравнение Path разбирает путь на компоненты при каждом сравнении,
+    # что на тысячах файлов заметно дороже строкового sort()
+    names.sort()
+    base = os.fspath(input_dir)
+    return [Path(os.path.join(base, name)) for name in names]
+
+
+# Кэш: батч обычно состоит из фото одинаковых размеров (одна камера),
+# так что результат на размер считается один раз, дальше — dict-lookup
+@lru_cache(maxsize=256)
 def calculate_new_size(
     original_size: Tuple[int, int],
     *,
@@ -60,6 +147,9 @@ def calculate_new_size(
     orig_w, orig_h = original_size
 
     if max_side is not None:
+        # Исходник уже вписывается — не апскейлим
+        if max(orig_w, orig_h) <= max_side:
+            return original_size
         ratio = max_side / max(orig_w, orig_h)
         return _apply_ratio(orig_w, orig_h, ratio)
 
@@ -81,9 +171,29 @@ def _apply_ratio(w: int, h: int, ratio: float) -> Tuple[int, int]:
     return (max(1, round(w * ratio)), max(1, round(h * ratio)))
 
 
+def _output_name(
+    src: Path,
+    out_format: Optional[str],
+    custom_name: Optional[str],
+) -> str:
+    """Имя выходного файла (stem + расширение) — без открытия изображения."""
+    ext = _FORMAT_EXT[out_format.lower()] if out_format else src.suffix.lower()
+    return (custom_name if custom_name else src.stem) + ext
+
+
+def _is_up_to_date(out_path: str, src: Path) -> bool:
+    """True, если выходной файл существует и не старше исходника."""
+    try:
+        return os.path.getmtime(out_path) >= src.stat().st_mtime
+    except OSError:
+        return False
+
+
 def crop_center(img: Image.Image, target_w: int, target_h: int) -> Image.Image:
     """Обрезает изображение по центру до target_w × target_h."""
     img_w, img_h = img.size
+    if (img_w, img_h) == (target_w, target_h):
+        return img  # размер уже целевой — без копии растра
     left = (img_w - target_w) // 2
     top = (img_h - target_h) // 2
     right = left + target_w
@@ -91,34 +201,76 @@ def crop_center(img: Image.Image, target_w: int, target_h: int) -> Image.Image:
     return img.crop((left, top, right, bottom))
 
 
+def build_gamma_lut(gamma: float) -> list[int]:
+    """256-элементная LUT гамма-коррекции: out = (in / 255) ** gamma * 255."""
+    return [min(255, round((i / 255.0) ** gamma * 255.0)) for i in range(256)]
+
+
+def apply_gamma(img: Image.Image, gamma: float) -> Image.Image:
+    """
+    Гамма-коррекция через Image.point: LUT считается один раз на 256
+    значений, а по пикселям проходит C-цикл Pillow — Python-циклов по
+    растру нет. Альфа-канал не трогаем.
+    """
+    if gamma == 1.0:
+        return img
+    if img.mode == "P":  # point() по палитровым индексам исказил бы цвета
+        img = img.convert("RGBA")
+    lut = build_gamma_lut(gamma)
+    bands = img.getbands()
+    if bands[-1] == "A":
+        table = lut * (len(bands) - 1) + list(range(256))
+    else:
+        table = lut * len(bands)
+    return img.point(table)
+
+
+def _flatten_onto_white(img: Image.Image) -> Image.Image:
+    # Композитим на белый фон одним C-проходом paste-с-маской:
+    # convert("RGB") просто отбросил бы альфу, оставив под прозрачными
+    # областями «мусорные» цвета исходника
+    background = Image.new("RGB", img.size, (255, 255, 255))
+    background.paste(img, mask=img.getchannel("A"))
+    return background
+
+
+def _to_rgb(img: Image.Image) -> Image.Image:
+    return img.convert("RGB")
+
+
+# Конвертер по mode для JPEG-выхода: один dict-lookup вместо каскада if,
+# и каждый путь — отдельная маленькая функция
+_JPEG_MODE_CONVERTERS: dict[str, Callable[[Image.Image], Image.Image]] = {
+    "RGBA": _flatten_onto_white,
+    "LA": _flatten_onto_white,
+    "P": _to_rgb,
+}
+
+
 def ensure_rgb(img: Image.Image, target_format: str) -> Image.Image:
     """Конвертирует в RGB, если целевой формат — JPEG (не поддерживает альфа)."""
-    if target_format == "JPEG" and img.mode in ("RGBA", "P", "LA"):
-        return img.convert("RGB")
-    return img
+    if target_format != "JPEG":
+        return img
+    convert = _JPEG_MODE_CONVERTERS.get(img.mode)
+    return convert(img) if convert is not None else img
 
 
 # ─── Основная обработка ──────────────────────────────────────────────────────
 
-def process_image(
-    src: Path,
-    dst_dir: Path,
-    *,
-    width: Optional[int] = None,
-    height: Optional[int] = None,
-    max_side: Optional[int] = None,
-    out_format: Optional[str] = None,
-    quality: int = DEFAULT_QUALITY,
-    do_crop_center: bool = False,
-    custom_name: Optional[str] = None,
-) -> Path:
+def _render(
+    img: Image.Image,
+    src_suffix: str,
+    options: SaveOptions,
+) -> tuple[Image.Image, str, str, dict]:
     """
-    Обрабатывает одно изображение и сохраняет результат в dst_dir.
+    Общий конвейер resize → crop → convert для одного изображения.
 
-    Если custom_name задано, файл сохраняется с этим именем (например, "logo-1").
-    Возвращает путь к сохранённому файлу.
+    Возвращает (обработанный img, PIL-формат, расширение, kwargs для save).
     """
-    img = Image.open(src)
+    width = options.width
+    height = options.height
+    max_side = options.max_side
+    out_format = options.out_format
     icc = img.info.get("icc_profile")
 
     # --- Resize ---
@@ -127,34 +279,190 @@ def process_image(
         new_size = calculate_new_size(
             img.size, width=width, height=height, max_side=max_side,
         )
-        img = img.resize(new_size, Image.LANCZOS)
+        # Целевой размер совпал с исходным — пропускаем весь проход свёртки
+        # (частый случай: повторный прогон, --max-side больше исходника)
+        if new_size != img.size:
+            # JPEG при даунскейле: draft() просит libjpeg декодировать сразу
+            # в масштабе 1/2, 1/4 или 1/8 (DCT-скейлинг) — в разы быстрее и
+            # экономит память. Мутирует img in-place до ближайшего размера
+            # ≥ new_size; точный размер даёт финальный resize ниже.
+            if img.format == "JPEG":
+                img.draft(None, new_size)
+            # draft() мог сам довести размер (точный DCT-скейл) — пересчитываем
+            src_w, src_h = img.size
+            new_w, new_h = new_size
+            if (src_w, src_h) != new_size:
+                if (src_w % new_w == 0 and src_h % new_h == 0
+                        and src_w // new_w == src_h // new_h
+                        and src_w // new_w > 1):
+                    # Точный целочисленный даунскейл (1920→960, 4000→800 и
+                    # т.п.): reduce() — специализированный блочный box-фильтр
+                    # на целочисленных add/shift, в разы быстрее свёртки
+                    # LANCZOS при неотличимом на даунскейле качестве
+                    img = img.reduce(src_w // new_w)
+                else:
+                    # reducing_gap=2.0 — тот же фаст-пас, что внутри
+                    # thumbnail(): Pillow сам делает предварительный
+                    # целочисленный reduce() с 2× запасом по размеру и
+                    # дочищает выбранным фильтром — свёртка и её буферы
+                    # работают по малому растру. В отличие от thumbnail()
+                    # результат — ровно new_size.
+                    img = img.resize(new_size, options.resample,
+                                     reducing_gap=2.0)
 
     # --- Crop center ---
-    if do_crop_center and width and height:
-        img = crop_center(img, width, height)
+    # Арифметика crop_center заинлайнена, чтобы не платить кадром вызова на
+    # каждый файл и дёшево отсечь no-op кроп (размер уже совпал после resize)
+    if options.do_crop_center and width and height:
+        img_w, img_h = img.size
+        if (img_w, img_h) != (width, height):
+            left = (img_w - width) // 2
+            top = (img_h - height) // 2
+            img = img.crop((left, top, left + width, top + height))
 
     # --- Формат ---
     if out_format:
         pil_format = FORMAT_MAP[out_format.lower()]
-        ext = f".{out_format.lower()}"
-        if ext == ".jpg":
-            ext = ".jpeg"
+        ext = _FORMAT_EXT[out_format.lower()]
     else:
-        pil_format = FORMAT_MAP.get(src.suffix.lower().lstrip("."), "JPEG")
-        ext = src.suffix.lower()
+        pil_format, ext = _SUFFIX_INFO.get(
+            src_suffix.lower(), ("JPEG", src_suffix.lower()),
+        )
 
     img = ensure_rgb(img, pil_format)
 
-    # --- Сохранение ---
-    out_stem = custom_name if custom_name else src.stem
-    out_path = dst_dir / (out_stem + ext)
+    # --- Гамма-коррекция (опционально) ---
+    if options.gamma is not None:
+        img = apply_gamma(img, options.gamma)
+
+    # --- Параметры сохранения ---
+    quality = options.quality if options.quality is not None else DEFAULT_QUALITY
     save_kwargs: dict = {"quality": quality}
+    if pil_format == "JPEG":
+        # 4:2:0 — стандартный chroma-subsampling для фото. optimize (второй
+        # проход Хаффмана: −5-15% размера, но ~2× времени энкода) и
+        # progressive — опциональные: по умолчанию работаем в один проход
+        # на SIMD-пути libjpeg-turbo
+        save_kwargs["subsampling"] = "4:2:0"
+        if options.jpeg_optimize:
+            save_kwargs["optimize"] = True
+        if options.jpeg_progressive:
+            save_kwargs["progressive"] = True
     if pil_format == "WEBP":
-        save_kwargs["method"] = 4  # баланс скорость/качество
+        save_kwargs["method"] = 4  # «усилие» энкодера 0-6 (как -m у cwebp)
+        if options.lossless:
+            # В lossless-режиме quality — уровень усилия сжатия, не потерь
+            save_kwargs["lossless"] = True
     if icc:
         save_kwargs["icc_profile"] = icc
-    img.save(out_path, format=pil_format, **save_kwargs)
-    return out_path
+    return img, pil_format, ext, save_kwargs
+
+
+def _can_passthrough(
+    img: Image.Image, src_suffix: str, options: SaveOptions,
+) -> bool:
+    """
+    True, если файл можно отдать байт-в-байт, без декода и ре-энкода.
+
+    Условия: размер не меняется, формат совпадает с исходным и не запрошена
+    ни одна опция, меняющая закодированный результат (crop/gamma/quality/
+    lossless/optimize/progressive). Проверка дешёвая: Image.open ленив и
+    до load() читает только заголовок, так что size известен без декода
+    растра.
+    """
+    if options.do_crop_center or options.gamma is not None:
+        return False
+    if options.quality is not None or options.lossless:
+        return False
+    if options.jpeg_optimize or options.jpeg_progressive:
+        return False
+    if options.out_format is not None:
+        src_info = _SUFFIX_INFO.get(src_suffix.lower())
+        if src_info is None or FORMAT_MAP[options.out_format.lower()] != src_info[0]:
+            return False
+    new_size = calculate_new_size(
+        img.size,
+        width=options.width, height=options.height, max_side=options.max_side,
+    )
+    return new_size == img.size
+
+
+def process_image(
+    src: Path,
+    dst_dir: Path,
+    *,
+    width: Optional[int] = None,
+    height: Optional[int] = None,
+    max_side: Optional[int] = None,
+    out_format: Optional[str] = None,
+    quality: Optional[int] = None,
+    do_crop_center: bool = False,
+    custom_name: Optional[str] = None,
+    resample: int = Image.LANCZOS,
+    lossless: bool = False,
+    skip_existing: bool = False,
+    options: Optional[SaveOptions] = None,
+) -> Path:
+    """
+    Обрабатывает одно изображение и сохраняет результат в dst_dir.
+
+    Если custom_name задано, файл сохраняется с этим именем (например, "logo-1").
+    При skip_existing=True актуальный выходной файл не пересоздаётся.
+    Пакетные вызовы могут передать готовый options вместо отдельных kwargs.
+    Возвращает путь к сохранённому файлу.
+    """
+    if options is None:
+        options = SaveOptions(
+            width=width, height=height, max_side=max_side,
+            out_format=out_format, quality=quality,
+            do_crop_center=do_crop_center, resample=resample, lossless=lossless,
+        )
+    # Строковый путь вместо Path: Pillow всё равно конвертирует Path в str,
+    # а Path.__truediv__ — лишняя аллокация на каждый файл в батче.
+    # Имя считаем до открытия, чтобы skip-проверка обходилась одним stat()
+    out_path = os.path.join(
+        os.fspath(dst_dir), _output_name(src, options.out_format, custom_name),
+    )
+    if skip_existing and _is_up_to_date(out_path, src):
+        return Path(out_path)
+    # with-блок закрывает файл и отпускает буфер декода сразу по выходу,
+    # не дожидаясь GC — важно на больших батчах (лимит fd, пик памяти)
+    with Image.open(src) as im:
+        # Passthrough: никакой пиксельной работы не требуется — просто
+        # копируем файл (10-100× быстрее декода+ре-энкода, и без потерь
+        # поколения)
+        if _can_passthrough(im, src.suffix, options):
+            shutil.copyfile(src, out_path)
+            return Path(out_path)
+        img, pil_format, _ext, save_kwargs = _render(im, src.suffix, options)
+        # Кодируем в память и пишем одним write(): иначе энкодер сыплет
+        # множеством мелких write() (JPEG — по маркерам, WebP — по чанкам),
+        # что дорого на сетевых ФС и при fsync
+        buf = io.BytesIO()
+        img.save(buf, format=pil_format, **save_kwargs)
+    with open(out_path, "wb") as fh:
+        fh.write(buf.getbuffer())
+    return Path(out_path)
+
+
+def _process_raw(
+    raw: bytes, src_suffix: str, out_stem: str, options: SaveOptions,
+) -> tuple[str, bytes]:
+    """
+    Worker конвейера: обрабатывает изображение из сырых байтов и возвращает
+    (имя выходного файла, закодированные байты). Запись на диск — на стороне
+    вызывающего, чтобы I/O не блокировал пул.
+    """
+    with Image.open(io.BytesIO(raw)) as im:
+        if _can_passthrough(im, src_suffix, options):
+            # Пиксельной работы нет — исходные байты возвращаются как есть
+            ext = (_FORMAT_EXT[options.out_format.lower()]
+                   if options.out_format else src_suffix.lower())
+            return out_stem + ext, raw
+        img, pil_format, ext, save_kwargs = _render(im, src_suffix, options)
+        buf = io.BytesIO()
+        img.save(buf, format=pil_format, **save_kwargs)
+    return out_stem + ext, buf.getvalue()
 
 
 # ─── CLI ──────────────────────────────────────────────────────────────────────
@@ -190,12 +498,35 @@ def build_parser() -> argparse.ArgumentParser:
     p.add_argument("-f", "--format", dest="out_format", default=None,
                    choices=["jpeg", "png", "webp"],
                    help="Выходной формат (jpeg | png | webp)")
-    p.add_argument("-q", "--quality", type=int, default=DEFAULT_QUALITY,
-                   help=f"Качество сжатия 0-100 (по умолчанию {DEFAULT_QUALITY})")
+    p.add_argument("-q", "--quality", type=int, default=None,
+                   help=f"Качество сжатия 0-100 (по умолчанию {DEFAULT_QUALITY}; "
+                        "явное значение отключает копирование «как есть» "
+                        "файлов, которым не нужна обработка)")
+    p.add_argument("--gamma", type=float, default=None,
+                   help="Гамма-коррекция (например 0.8 — светлее, 2.2 — темнее)")
+    p.add_argument("--skip-existing", action="store_true",
+                   help="Пропускать файлы, чей выходной файл уже существует "
+                        "и не старше исходника (инкрементальные прогоны)")
+    p.add_argument("--jpeg-optimize", action=argparse.BooleanOptionalAction,
+                   default=False,
+                   help="JPEG: второй проход Хаффмана (файл на 5-15% меньше, "
+                        "но энкод ~2× медленнее)")
+    p.add_argument("--jpeg-progressive", action=argparse.BooleanOptionalAction,
+                   default=False,
+                   help="JPEG: прогрессивная развёртка (для больших фото "
+                        "обычно меньший файл)")
+    p.add_argument("--lossless", action="store_true",
+                   help="WebP: сжатие без потерь (медленнее; --quality задаёт "
+                        "усилие сжатия, а не потери)")
+    p.add_argument("--filter", dest="resample_filter", default="lanczos",
+                   choices=list(FILTER_MAP),
+                   help="Фильтр ресайза (по умолчанию lanczos; bicubic быстрее)")
     p.add_argument("--crop-center", action="store_true",
                    help="Обрезать по центру до --width × --height после resize")
     p.add_argument("-n", "--name", dest="custom_name", default=None,
                    help="Базовое имя для выходных файлов (например: logo → logo-1, logo-2, …)")
+    p.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                   help="Число параллельных процессов (по умолчанию: число ядер CPU)")
 
     return p
 
@@ -203,15 +534,19 @@ def build_parser() -> argparse.ArgumentParser:
 def validate_args(args: argparse.Namespace) -> None:
     if not args.input.is_dir():
         sys.exit(f"✖ Входная папка не найдена: {args.input}")
-    if not 0 <= args.quality <= 100:
+    if args.quality is not None and not 0 <= args.quality <= 100:
         sys.exit("✖ --quality должно быть в диапазоне 0-100")
     if args.crop_center and (args.width is None or args.height is None):
         sys.exit("✖ --crop-center требует указания --width и --height")
+    if args.jobs is not None and args.jobs < 1:
+        sys.exit("✖ --jobs должно быть ≥ 1")
+    if args.gamma is not None and args.gamma <= 0:
+        sys.exit("✖ --gamma должно быть > 0")
 
 
-def main() -> None:
+def main(argv: Optional[list[str]] = None) -> None:
     parser = build_parser()
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     validate_args(args)
 
     # Авто-генерация output если не указан
@@ -230,37 +565,90 @@ def main() -> None:
     print(f"📂 Найдено изображений: {total}")
     print(f"   Вход:  {args.input.resolve()}")
     print(f"   Выход: {args.output.resolve()}")
+    # Версия Pillow: у pillow-simd в версии есть суффикс .postN —
+    # так видно, активны ли SIMD-ядра ресайза; заодно показываем,
+    # каким libjpeg слинкован энкодер
+    jpeg_lib = "libjpeg-turbo" if features.check_feature("libjpeg_turbo") else "libjpeg"
+    print(f"   Pillow: {PILLOW_VERSION} ({jpeg_lib})")
     print()
 
     success = 0
     errors: list[str] = []
     t0 = time.perf_counter()
 
-    for idx, src in enumerate(images, start=1):
-        # Генерируем кастомное имя: name-1, name-2, …
-        custom_name = f"{args.custom_name}-{idx}" if args.custom_name else None
-
-        try:
-            out = process_image(
+    # Все инвариантные параметры батча — один раз, до цикла
+    options = SaveOptions.from_args(args)
+
+    # Трёхзвенный конвейер: поток-читатель → пул процессов (декод/ресайз/
+    # энкод, CPU-bound) → запись на диск здесь, в основном потоке. Чтение и
+    # запись перекрываются с вычислениями; семафор ограничивает число заявок
+    # «в полёте» на всём пути от чтения до записи результата (слот
+    # освобождается в цикле-писателе) — если диск пишет медленнее, чем пул
+    # кодирует, читатель притормаживает, и память не растёт с размером батча.
+    jobs = args.jobs or 1
+    inflight = threading.BoundedSemaphore(2 * jobs)
+    results: queue.Queue = queue.Queue()
+
+    def _read_and_submit(executor: ProcessPoolExecutor) -> None:
+        for idx, src in enumerate(images, start=1):
+            # Генерируем кастомное имя: name-1, name-2, …
+            out_stem = f"{args.custom_name}-{idx}" if args.custom_name else src.stem
+            # Инкрементальный прогон: один stat() вместо декода+энкода
+            if args.skip_existing and _is_up_to_date(
+                os.path.join(out_dir, _output_name(src, args.out_format, out_stem)),
                 src,
-                args.output,
-                width=args.width,
-                height=args.height,
-                max_side=args.max_side,
-                out_format=args.out_format,
-                quality=args.quality,
-                do_crop_center=args.crop_center,
-                custom_name=custom_name,
-            )
-            print(f"  [{idx}/{total}] ✔ {src.name} → {out.name}")
-            success += 1
-        except Exception as exc:
-            errors.append(f"{src.name}: {exc}")
-            print(f"  [{idx}/{total}] ✖ {src.name} — {exc}")
+            ):
+                results.put((src, None))
+                continue
+            inflight.acquire()
+            try:
+                raw = src.read_bytes()
+            except OSError as exc:
+                results.put((src, exc))
+                continue
+            fut = executor.submit(_process_raw, raw, src.suffix, out_stem, options)
+            fut.add_done_callback(lambda f, src=src: results.put((src, f)))
+
+    out_dir = os.fspath(args.output)  # один раз, а не Path-арифметика в цикле
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        reader = threading.Thread(
+            target=_read_and_submit, args=(executor,), daemon=True,
+        )
+        reader.start()
+
+        skipped = 0
+        for done in range(1, total + 1):
+            src, item = results.get()
+            if item is None:
+                print(f"  [{done}/{total}] ↷ {src.name} — уже обработан, пропуск")
+                skipped += 1
+                success += 1
+                continue
+            try:
+                if isinstance(item, Exception):
+                    raise item
+                out_name, data = item.result()
+                with open(os.path.join(out_dir, out_name), "wb") as fh:
+                    fh.write(data)
+                print(f"  [{done}/{total}] ✔ {src.name} → {out_name}")
+                success += 1
+            except Exception as exc:
+                errors.append(f"{src.name}: {exc}")
+                print(f"  [{done}/{total}] ✖ {src.name} — {exc}")
+            finally:
+                # Слот освобождается только после записи (или обработки
+                # ошибки): иначе готовые результаты копились бы в results
+                # без ограничения, пока писатель не поспевает за пулом
+                inflight.release()
+
+        reader.join()
 
     elapsed = time.perf_counter() - t0
     print()
     print(f"✅ Готово: {success}/{total} за {elapsed:.2f}с")
+    if skipped:
+        print(f"   (пропущено как актуальные: {skipped})")
     if errors:
         print(f"⚠  Ошибки ({len(errors)}):")
         for e in errors:
@@ -268,4 +656,5 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # для PyInstaller-бинарника
     main()
@@ -10,14 +10,18 @@ make-370x370 — Автономный скрипт для создания из
 
 Пресет:
   Формат:   WebP
-  Качество: 100
+  Качество: 90
   Размер:   370 × 370 px (resize + crop по центру)
 """
 
 from __future__ import annotations
 
+import io
+import multiprocessing
+import os
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Tuple
 
@@ -29,7 +33,10 @@ WIDTH = 370
 HEIGHT = 370
 FORMAT = "WEBP"
 FORMAT_EXT = ".webp"
-QUALITY = 100
+# 100 — самый медленный lossy-пресет при неразличимой на фото разнице;
+# 90 кодирует в разы быстрее. method — «усилие» энкодера libwebp (0-6),
+# 4 — баланс скорость/сжатие (как -m у cwebp).
+QUALITY = 90
 
 SUPPORTED_EXTENSIONS: set[str] = {".jpg", ".jpeg", ".png", ".webp"}
 
@@ -38,32 +45,52 @@ SUPPORTED_EXTENSIONS: set[str] = {".jpg", ".jpeg", ".png", ".webp"}
 
 def collect_images(input_dir: Path) -> list[Path]:
     """Собирает все поддерживаемые изображения из директории."""
-    return sorted(
-        p for p in input_dir.iterdir()
-        if p.is_file() and p.suffix.lower() in SUPPORTED_EXTENSIONS
-    )
-
-
-def crop_center(img: Image.Image, target_w: int, target_h: int) -> Image.Image:
-    """Обрезает изображение по центру до target_w × target_h."""
-    img_w, img_h = img.size
-    left = (img_w - target_w) // 2
-    top = (img_h - target_h) // 2
-    return img.crop((left, top, left + target_w, top + target_h))
-
-
-def fit_and_crop(img: Image.Image, target_w: int, target_h: int) -> Image.Image:
+    # os.scandir отдаёт DirEntry с закэшированным is_file() — в отличие от
+    # iterdir() не делает лишний stat() на каждый файл
+    with os.scandir(input_dir) as it:
+        images = [
+            Path(entry.path) for entry in it
+            if entry.is_file()
+            and os.path.splitext(entry.name)[1].lower() in SUPPORTED_EXTENSIONS
+        ]
+    images.sort()
+    return images
+
+
+def fit_and_crop(
+    img: Image.Image,
+    target_w: int,
+    target_h: int,
+    resample: int = Image.LANCZOS,
+) -> Image.Image:
     """
     Масштабирует изображение так, чтобы оно полностью покрывало target,
     затем обрезает по центру. Аналог CSS object-fit: cover.
+
+    Скейл и кроп слиты в один вызов resize(box=...): свёртка считается
+    только по видимой области, без большого промежуточного растра,
+    который раньше тут же обрезался.
     """
+    # JPEG при даунскейле: draft() просит libjpeg декодировать сразу
+    # в масштабе 1/2, 1/4 или 1/8 (DCT-скейлинг) — в разы быстрее.
+    # Мутирует img in-place, поэтому размеры пересчитываем после.
+    if img.format == "JPEG":
+        orig_w, orig_h = img.size
+        scale = max(target_w / orig_w, target_h / orig_h)
+        img.draft(None, (max(1, round(orig_w * scale)),
+                         max(1, round(orig_h * scale))))
+
     orig_w, orig_h = img.size
-    # Масштаб: берём больший, чтобы покрыть целевой размер
+    # Область исходника, которая после масштабирования покроет target
     scale = max(target_w / orig_w, target_h / orig_h)
-    new_w = max(1, round(orig_w * scale))
-    new_h = max(1, round(orig_h * scale))
-    img = img.resize((new_w, new_h), Image.LANCZOS)
-    return crop_center(img, target_w, target_h)
+    crop_w = target_w / scale
+    crop_h = target_h / scale
+    left = (orig_w - crop_w) / 2
+    top = (orig_h - crop_h) / 2
+    return img.resize(
+        (target_w, target_h), resample,
+        box=(left, top, left + crop_w, top + crop_h),
+    )
 
 
 def ensure_rgb(img: Image.Image) -> Image.Image:
@@ -87,7 +114,11 @@ def process_image(src: Path, dst_dir: Path, custom_name: str) -> Path:
     if icc:
         save_kwargs["icc_profile"] = icc
 
-    img.save(out_path, **save_kwargs)
+    # Кодируем в память и пишем одним write(): иначе энкодер сыплет
+    # множеством мелких write() (WebP — по чанкам)
+    buf = io.BytesIO()
+    img.save(buf, **save_kwargs)
+    out_path.write_bytes(buf.getbuffer())
     return out_path
 
 
@@ -110,7 +141,7 @@ def main() -> None:
 
     print()
     print("╔══════════════════════════════════════════╗")
-    print("║   make-370x370  •  WebP  •  quality 100  ║")
+    print("║   make-370x370  •  WebP  •  quality 90   ║")
     print("╚══════════════════════════════════════════╝")
     print()
     print(f"  📂 Папка с фото: {work_dir}")
@@ -149,15 +180,20 @@ def main() -> None:
     errors: list[str] = []
     t0 = time.perf_counter()
 
-    for idx, src in enumerate(images, start=1):
-        custom_name = f"{name}-{idx}"
-        try:
-            out = process_image(src, output_dir, custom_name)
-            print(f"    [{idx}/{total}] ✔ {src.name} → {out.name}")
-            success += 1
-        except Exception as exc:
-            errors.append(f"{src.name}: {exc}")
-            print(f"    [{idx}/{total}] ✖ {src.name} — {exc}")
+    # Pillow-декод/ресайз/энкод — CPU-bound, поэтому раздаём файлы по процессам
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        futures = [
+            executor.submit(process_image, src, output_dir, f"{name}-{idx}")
+            for idx, src in enumerate(images, start=1)
+        ]
+        for idx, (src, fut) in enumerate(zip(images, futures), start=1):
+            try:
+                out = fut.result()
+                print(f"    [{idx}/{total}] ✔ {src.name} → {out.name}")
+                success += 1
+            except Exception as exc:
+                errors.append(f"{src.name}: {exc}")
+                print(f"    [{idx}/{total}] ✖ {src.name} — {exc}")
 
     elapsed = time.perf_counter() - t0
     print()
@@ -172,4 +208,5 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # для PyInstaller-бинарника
     main()
@@ -5,6 +5,8 @@ conftest.py — фикстуры и генерация синтетически
 from __future__ import annotations
 
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 import pytest
@@ -34,42 +36,49 @@ def _make_palette(w: int, h: int) -> Image.Image:
 def generate_test_images(target_dir: Path) -> dict[str, Path]:
     """Создаёт набор синтетических изображений для тестов. Возвращает dict имя → путь."""
     target_dir.mkdir(parents=True, exist_ok=True)
-    generated: dict[str, Path] = {}
-
-    # 1. Обычный JPEG 1920×1080
-    p = target_dir / "landscape.jpg"
-    _make_rgb(1920, 1080, (30, 120, 200)).save(p, "JPEG", quality=90)
-    generated["landscape_jpg"] = p
-
-    # 2. Портрет PNG 800×1200
-    p = target_dir / "portrait.png"
-    _make_rgb(800, 1200, (200, 50, 80)).save(p, "PNG")
-    generated["portrait_png"] = p
-
-    # 3. Квадрат WebP 1000×1000
-    p = target_dir / "square.webp"
-    _make_rgb(1000, 1000, (50, 200, 100)).save(p, "WEBP", quality=85)
-    generated["square_webp"] = p
-
-    # 4. RGBA PNG (с альфа-каналом) 640×480
-    p = target_dir / "with_alpha.png"
-    _make_rgba(640, 480, (255, 255, 0, 128)).save(p, "PNG")
-    generated["rgba_png"] = p
-
-    # 5. Palette-mode PNG 320×240
-    p = target_dir / "palette.png"
-    _make_palette(320, 240).save(p, "PNG")
-    generated["palette_png"] = p
-
-    # 6. Маленькое изображение 10×10 (граничный случай)
-    p = target_dir / "tiny.jpeg"
-    _make_rgb(10, 10, (0, 0, 0)).save(p, "JPEG")
-    generated["tiny_jpeg"] = p
-
-    # 7. Широкое изображение 4000×500
-    p = target_dir / "wide.png"
-    _make_rgb(4000, 500, (100, 100, 100)).save(p, "PNG")
-    generated["wide_png"] = p
+
+    # (ключ, имя файла, фабрика, kwargs для save)
+    specs = [
+        # 1. Обычный JPEG 1920×1080
+        ("landscape_jpg", "landscape.jpg",
+         lambda: _make_rgb(1920, 1080, (30, 120, 200)),
+         {"format": "JPEG", "quality": 90}),
+        # 2. Портрет PNG 800×1200
+        ("portrait_png", "portrait.png",
+         lambda: _make_rgb(800, 1200, (200, 50, 80)),
+         {"format": "PNG"}),
+        # 3. Квадрат WebP 1000×1000
+        ("square_webp", "square.webp",
+         lambda: _make_rgb(1000, 1000, (50, 200, 100)),
+         {"format": "WEBP", "quality": 85}),
+        # 4. RGBA PNG (с альфа-каналом) 640×480
+        ("rgba_png", "with_alpha.png",
+         lambda: _make_rgba(640, 480, (255, 255, 0, 128)),
+         {"format": "PNG"}),
+        # 5. Palette-mode PNG 320×240
+        ("palette_png", "palette.png",
+         lambda: _make_palette(320, 240),
+         {"format": "PNG"}),
+        # 6. Маленькое изображение 10×10 (граничный случай)
+        ("tiny_jpeg", "tiny.jpeg",
+         lambda: _make_rgb(10, 10, (0, 0, 0)),
+         {"format": "JPEG"}),
+        # 7. Широкое изображение 4000×500
+        ("wide_png", "wide.png",
+         lambda: _make_rgb(4000, 500, (100, 100, 100)),
+         {"format": "PNG"}),
+    ]
+
+    def _write(spec: tuple) -> tuple[str, Path]:
+        key, filename, factory, save_kwargs = spec
+        path = target_dir / filename
+        factory().save(path, **save_kwargs)
+        return key, path
+
+    # Энкодеры Pillow (JPEG/PNG/WebP) отпускают GIL, поэтому независимые
+    # файлы кодируем в пуле потоков — старт тест-сессии быстрее на многоядре
+    with ThreadPoolExecutor() as executor:
+        generated = dict(executor.map(_write, specs))
 
     # 8. Не-изображение (должно быть пропущено collect_images)
     p = target_dir / "readme.txt"
@@ -83,7 +92,18 @@ def generate_test_images(target_dir: Path) -> dict[str, Path]:
 
 @pytest.fixture(scope="session")
 def test_images_dir(tmp_path_factory) -> Path:
-    """Директория с синтетическими тестовыми изображениями (на всю сессию)."""
+    """
+    Директория с синтетическими тестовыми изображениями.
+
+    Session-scope намеренно: энкод исходников выполняется один раз на всю
+    сессию, а не перед каждым тестом. Тесты обязаны обращаться с директорией
+    как с read-only и писать только в свой output_dir — на этом же держится
+    корректность параллельного прогона через pytest-xdist.
+
+    In-memory кэш (BytesIO/ndarray) вместо файлов не даёт здесь выигрыша:
+    CLI-тесты и collect_images работают с реальными путями, а повторные
+    чтения этих маленьких файлов обслуживаются page cache на скорости RAM.
+    """
     d = tmp_path_factory.mktemp("input_images")
     generate_test_images(d)
     return d
@@ -91,12 +111,32 @@ def test_images_dir(tmp_path_factory) -> Path:
 
 @pytest.fixture()
 def output_dir(tmp_path) -> Path:
-    """Чистая выходная директория для каждого теста."""
+    """Чистая выходная директория для каждого теста (function-scope: изоляция)."""
     d = tmp_path / "output"
     d.mkdir()
     return d
 
 
+@lru_cache(maxsize=None)
+def _cached_image(mode: str, size: tuple[int, int], color) -> Image.Image:
+    return Image.new(mode, size, color)
+
+
+@pytest.fixture(scope="session")
+def make_image():
+    """
+    Фабрика одноцветных изображений с кэшем на всю сессию.
+
+    Image.new выделяет и заполняет свежий буфер при каждом вызове (для
+    1920×1080 это ~6 МБ memset на тест), а юнит-тестам нужен просто
+    одинаковый исходник. Возвращаемые изображения разделяются между
+    тестами — обращаться только как с read-only.
+    """
+    def _make(mode: str, size: tuple[int, int], color=0) -> Image.Image:
+        return _cached_image(mode, size, color)
+    return _make
+
+
 @pytest.fixture(scope="session")
 def real_images_dir() -> Path | None:
     """
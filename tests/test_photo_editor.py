@@ -15,10 +15,12 @@ from PIL import Image
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
 from photo_editor import (
+    apply_gamma,
     calculate_new_size,
     collect_images,
     crop_center,
     ensure_rgb,
+    main,
     process_image,
 )
 
@@ -67,6 +69,13 @@ class TestCalculateNewSize:
         assert w == 960
         assert h == 540
 
+    def test_max_side_no_upscale(self):
+        """max_side больше исходника — размер не меняется (без апскейла)."""
+        assert calculate_new_size((800, 600), max_side=2000) == (800, 600)
+
+    def test_max_side_equal_is_noop(self):
+        assert calculate_new_size((1920, 1080), max_side=1920) == (1920, 1080)
+
     def test_tiny_result_at_least_1px(self):
         w, h = calculate_new_size((10000, 1), max_side=1)
         assert w >= 1
@@ -80,18 +89,18 @@ class TestCalculateNewSize:
 class TestCropCenter:
     """Тесты для функции crop_center."""
 
-    def test_crop_center_basic(self):
-        img = Image.new("RGB", (1000, 800), (255, 0, 0))
+    def test_crop_center_basic(self, make_image):
+        img = make_image("RGB", (1000, 800), (255, 0, 0))
         result = crop_center(img, 500, 400)
         assert result.size == (500, 400)
 
-    def test_crop_center_no_change(self):
-        img = Image.new("RGB", (500, 500), (0, 0, 0))
+    def test_crop_center_no_change(self, make_image):
+        img = make_image("RGB", (500, 500), (0, 0, 0))
         result = crop_center(img, 500, 500)
         assert result.size == (500, 500)
 
-    def test_crop_center_small_target(self):
-        img = Image.new("RGB", (1920, 1080), (0, 0, 0))
+    def test_crop_center_small_target(self, make_image):
+        img = make_image("RGB", (1920, 1080), (0, 0, 0))
         result = crop_center(img, 100, 100)
         assert result.size == (100, 100)
 
@@ -103,32 +112,65 @@ class TestCropCenter:
 class TestEnsureRgb:
     """Тесты конвертации в RGB для JPEG."""
 
-    def test_rgba_to_rgb_for_jpeg(self):
-        img = Image.new("RGBA", (100, 100), (255, 0, 0, 128))
+    def test_rgba_to_rgb_for_jpeg(self, make_image):
+        img = make_image("RGBA", (100, 100), (255, 0, 0, 128))
         result = ensure_rgb(img, "JPEG")
         assert result.mode == "RGB"
 
-    def test_palette_to_rgb_for_jpeg(self):
-        img = Image.new("P", (100, 100))
+    def test_palette_to_rgb_for_jpeg(self, make_image):
+        img = make_image("P", (100, 100))
         result = ensure_rgb(img, "JPEG")
         assert result.mode == "RGB"
 
-    def test_rgb_stays_rgb_for_jpeg(self):
-        img = Image.new("RGB", (100, 100), (255, 0, 0))
+    def test_rgb_stays_rgb_for_jpeg(self, make_image):
+        img = make_image("RGB", (100, 100), (255, 0, 0))
         result = ensure_rgb(img, "JPEG")
         assert result.mode == "RGB"
 
-    def test_rgba_stays_rgba_for_png(self):
-        img = Image.new("RGBA", (100, 100), (255, 0, 0, 128))
+    def test_rgba_flattened_onto_white(self, make_image):
+        """Прозрачные области композитятся на белый фон, а не «грязный» цвет."""
+        img = make_image("RGBA", (10, 10), (255, 0, 0, 0))
+        result = ensure_rgb(img, "JPEG")
+        assert result.getpixel((5, 5)) == (255, 255, 255)
+
+    def test_rgba_stays_rgba_for_png(self, make_image):
+        img = make_image("RGBA", (100, 100), (255, 0, 0, 128))
         result = ensure_rgb(img, "PNG")
         assert result.mode == "RGBA"
 
-    def test_rgba_stays_rgba_for_webp(self):
-        img = Image.new("RGBA", (100, 100), (255, 0, 0, 128))
+    def test_rgba_stays_rgba_for_webp(self, make_image):
+        img = make_image("RGBA", (100, 100), (255, 0, 0, 128))
         result = ensure_rgb(img, "WEBP")
         assert result.mode == "RGBA"
 
 
+# ═══════════════════════════════════════════════════════════════════════════════
+#  Unit-тесты: apply_gamma
+# ═══════════════════════════════════════════════════════════════════════════════
+
+class TestApplyGamma:
+    """Тесты гамма-коррекции через LUT."""
+
+    def test_gamma_above_one_darkens(self, make_image):
+        img = make_image("RGB", (10, 10), (128, 128, 128))
+        out = apply_gamma(img, 2.2)
+        assert out.getpixel((0, 0))[0] < 128
+
+    def test_gamma_below_one_brightens(self, make_image):
+        img = make_image("RGB", (10, 10), (128, 128, 128))
+        out = apply_gamma(img, 0.5)
+        assert out.getpixel((0, 0))[0] > 128
+
+    def test_gamma_one_is_noop(self, make_image):
+        img = make_image("RGB", (10, 10), (128, 128, 128))
+        assert apply_gamma(img, 1.0) is img
+
+    def test_gamma_preserves_alpha(self, make_image):
+        img = make_image("RGBA", (10, 10), (128, 128, 128, 77))
+        out = apply_gamma(img, 2.2)
+        assert out.getpixel((0, 0))[3] == 77
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 #  Unit-тесты: collect_images
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -168,69 +210,61 @@ class TestProcessImage:
     def test_resize_max_side(self, test_images_dir, output_dir):
         src = test_images_dir / "landscape.jpg"
         out = process_image(src, output_dir, max_side=960)
-        img = Image.open(out)
-        assert max(img.size) == 960
-        assert img.size == (960, 540)
+        with Image.open(out) as img:
+            assert max(img.size) == 960
+            assert img.size == (960, 540)
 
     def test_resize_width_only(self, test_images_dir, output_dir):
         src = test_images_dir / "landscape.jpg"
         out = process_image(src, output_dir, width=480)
-        img = Image.open(out)
-        assert img.size[0] == 480
-        # Пропорционально 1920:1080 → 480:270
-        assert img.size[1] == 270
+        with Image.open(out) as img:
+            assert img.size[0] == 480
+            # Пропорционально 1920:1080 → 480:270
+            assert img.size[1] == 270
 
     def test_resize_height_only(self, test_images_dir, output_dir):
         src = test_images_dir / "portrait.png"
         out = process_image(src, output_dir, height=600)
-        img = Image.open(out)
-        assert img.size[1] == 600
-        # 800:1200 → 400:600
-        assert img.size[0] == 400
-
-    def test_convert_to_webp(self, test_images_dir, output_dir):
-        src = test_images_dir / "landscape.jpg"
-        out = process_image(src, output_dir, out_format="webp")
-        assert out.suffix == ".webp"
-        img = Image.open(out)
-        assert img.format == "WEBP"
-
-    def test_convert_to_jpeg(self, test_images_dir, output_dir):
-        src = test_images_dir / "portrait.png"
-        out = process_image(src, output_dir, out_format="jpeg")
-        assert out.suffix == ".jpeg"
-        img = Image.open(out)
-        assert img.format == "JPEG"
-
-    def test_convert_to_png(self, test_images_dir, output_dir):
-        src = test_images_dir / "landscape.jpg"
-        out = process_image(src, output_dir, out_format="png")
-        assert out.suffix == ".png"
-        img = Image.open(out)
-        assert img.format == "PNG"
+        with Image.open(out) as img:
+            assert img.size[1] == 600
+            # 800:1200 → 400:600
+            assert img.size[0] == 400
+
+    @pytest.mark.parametrize("src_name,fmt,ext,pil_fmt", [
+        ("landscape.jpg", "webp", ".webp", "WEBP"),
+        ("portrait.png", "jpeg", ".jpeg", "JPEG"),
+        ("landscape.jpg", "png", ".png", "PNG"),
+    ])
+    def test_convert_format(self, test_images_dir, output_dir,
+                            src_name, fmt, ext, pil_fmt):
+        src = test_images_dir / src_name
+        out = process_image(src, output_dir, out_format=fmt)
+        assert out.suffix == ext
+        with Image.open(out) as img:
+            assert img.format == pil_fmt
 
     def test_rgba_to_jpeg_conversion(self, test_images_dir, output_dir):
         """RGBA PNG → JPEG должен пройти без ошибок (конвертация в RGB)."""
         src = test_images_dir / "with_alpha.png"
         out = process_image(src, output_dir, out_format="jpeg")
-        img = Image.open(out)
-        assert img.mode == "RGB"
-        assert img.format == "JPEG"
+        with Image.open(out) as img:
+            assert img.mode == "RGB"
+            assert img.format == "JPEG"
 
     def test_palette_to_jpeg_conversion(self, test_images_dir, output_dir):
         """Palette PNG → JPEG без ошибок."""
         src = test_images_dir / "palette.png"
         out = process_image(src, output_dir, out_format="jpeg")
-        img = Image.open(out)
-        assert img.mode == "RGB"
+        with Image.open(out) as img:
+            assert img.mode == "RGB"
 
     def test_crop_center_integration(self, test_images_dir, output_dir):
         src = test_images_dir / "landscape.jpg"
         out = process_image(
             src, output_dir, width=800, height=600, do_crop_center=True,
         )
-        img = Image.open(out)
-        assert img.size == (800, 600)
+        with Image.open(out) as img:
+            assert img.size == (800, 600)
 
     def test_quality_affects_file_size(self, test_images_dir, output_dir):
         """Низкое качество → меньший файл."""
@@ -248,23 +282,23 @@ class TestProcessImage:
     def test_no_resize_keeps_original_dimensions(self, test_images_dir, output_dir):
         src = test_images_dir / "square.webp"
         out = process_image(src, output_dir)
-        img = Image.open(out)
-        assert img.size == (1000, 1000)
+        with Image.open(out) as img:
+            assert img.size == (1000, 1000)
 
     def test_wide_image_max_side(self, test_images_dir, output_dir):
         src = test_images_dir / "wide.png"
         out = process_image(src, output_dir, max_side=800)
-        img = Image.open(out)
-        assert max(img.size) == 800
-        # 4000×500 → 800×100
-        assert img.size == (800, 100)
+        with Image.open(out) as img:
+            assert max(img.size) == 800
+            # 4000×500 → 800×100
+            assert img.size == (800, 100)
 
     def test_tiny_image_resize_up(self, test_images_dir, output_dir):
         """Маленькое изображение можно увеличить."""
         src = test_images_dir / "tiny.jpeg"
         out = process_image(src, output_dir, width=100, height=100)
-        img = Image.open(out)
-        assert img.size == (100, 100)
+        with Image.open(out) as img:
+            assert img.size == (100, 100)
 
     def test_output_file_name_preserved(self, test_images_dir, output_dir):
         src = test_images_dir / "landscape.jpg"
@@ -278,6 +312,15 @@ class TestProcessImage:
         assert out.stem == "logo-1"
         assert out.exists()
 
+    def test_skip_existing_reuses_output(self, test_images_dir, output_dir):
+        """skip_existing=True не пересоздаёт актуальный выходной файл."""
+        src = test_images_dir / "landscape.jpg"
+        out = process_image(src, output_dir, max_side=500)
+        mtime_first = out.stat().st_mtime_ns
+        out_again = process_image(src, output_dir, max_side=500, skip_existing=True)
+        assert out_again == out
+        assert out.stat().st_mtime_ns == mtime_first
+
     def test_custom_name_with_format(self, test_images_dir, output_dir):
         """custom_name + out_format корректно работают вместе."""
         src = test_images_dir / "landscape.jpg"
@@ -292,12 +335,19 @@ class TestProcessImage:
 # ═══════════════════════════════════════════════════════════════════════════════
 
 class TestCLI:
-    """End-to-end тесты через вызов скрипта как subprocess."""
+    """
+    Тесты CLI через in-process вызов main(argv).
+
+    Раньше каждый тест форкал отдельный интерпретатор (subprocess), платя
+    ~сотни мс за старт Python + импорт Pillow — дороже самой проверки.
+    Теперь ошибочные пути проверяются через SystemExit + capsys, и только
+    test_cli_basic_run остаётся настоящим subprocess-E2E.
+    """
 
     SCRIPT = str(Path(__file__).resolve().parent.parent / "photo_editor.py")
 
     def test_cli_basic_run(self, test_images_dir, output_dir):
-        result = subprocess.run(
+        proc = subprocess.Popen(
             [
                 sys.executable, self.SCRIPT,
                 "--input", str(test_images_dir),
@@ -306,84 +356,64 @@ class TestCLI:
                 "--format", "webp",
                 "--quality", "75",
             ],
-            capture_output=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
             text=True,
         )
-        assert result.returncode == 0
-        assert "✅ Готово" in result.stdout
+        # communicate() дренирует оба пайпа, пока ребёнок ещё работает —
+        # при большом выводе он не повиснет на переполненном пайпе
+        out, err = proc.communicate()
+        assert proc.returncode == 0, err
+        assert "✅ Готово" in out
         # Должны быть webp-файлы в output
         webp_files = list(output_dir.glob("*.webp"))
         assert len(webp_files) > 0
 
     def test_cli_missing_input(self, tmp_path):
-        result = subprocess.run(
-            [
-                sys.executable, self.SCRIPT,
+        with pytest.raises(SystemExit) as exc:
+            main([
                 "--input", str(tmp_path / "nonexistent"),
                 "--output", str(tmp_path / "out"),
-            ],
-            capture_output=True,
-            text=True,
-        )
-        assert result.returncode != 0
+            ])
+        assert exc.value.code != 0
 
     def test_cli_crop_without_dimensions(self, test_images_dir, tmp_path):
-        result = subprocess.run(
-            [
-                sys.executable, self.SCRIPT,
+        with pytest.raises(SystemExit) as exc:
+            main([
                 "--input", str(test_images_dir),
                 "--output", str(tmp_path / "out"),
                 "--crop-center",
-            ],
-            capture_output=True,
-            text=True,
-        )
-        assert result.returncode != 0
+            ])
+        assert exc.value.code != 0
 
-    def test_cli_empty_input(self, tmp_path):
+    def test_cli_empty_input(self, tmp_path, capsys):
         empty_in = tmp_path / "empty_in"
         empty_in.mkdir()
-        result = subprocess.run(
-            [
-                sys.executable, self.SCRIPT,
+        with pytest.raises(SystemExit) as exc:
+            main([
                 "--input", str(empty_in),
                 "--output", str(tmp_path / "out"),
-            ],
-            capture_output=True,
-            text=True,
-        )
-        assert result.returncode == 0
-        assert "не найдены" in result.stdout
+            ])
+        assert exc.value.code == 0
+        assert "не найдены" in capsys.readouterr().out
 
     def test_cli_creates_output_dir(self, test_images_dir, tmp_path):
         out = tmp_path / "deep" / "nested" / "output"
-        result = subprocess.run(
-            [
-                sys.executable, self.SCRIPT,
-                "--input", str(test_images_dir),
-                "--output", str(out),
-            ],
-            capture_output=True,
-            text=True,
-        )
-        assert result.returncode == 0
+        main([
+            "--input", str(test_images_dir),
+            "--output", str(out),
+        ])
         assert out.is_dir()
 
-    def test_cli_custom_name(self, test_images_dir, output_dir):
+    def test_cli_custom_name(self, test_images_dir, output_dir, capsys):
         """CLI с --name logo генерирует файлы logo-1, logo-2, …"""
-        result = subprocess.run(
-            [
-                sys.executable, self.SCRIPT,
-                "--input", str(test_images_dir),
-                "--output", str(output_dir),
-                "--name", "logo",
-                "--format", "png",
-            ],
-            capture_output=True,
-            text=True,
-        )
-        assert result.returncode == 0
-        assert "✅ Готово" in result.stdout
+        main([
+            "--input", str(test_images_dir),
+            "--output", str(output_dir),
+            "--name", "logo",
+            "--format", "png",
+        ])
+        assert "✅ Готово" in capsys.readouterr().out
         png_files = sorted(output_dir.glob("logo-*.png"))
         assert len(png_files) > 0
         # Проверяем что именование корректно: logo-1.png, logo-2.png, …
@@ -409,9 +439,9 @@ class TestRealImages:
             pytest.skip("Папка real_images существует, но изображений нет")
         for src in images:
             out = process_image(src, output_dir, max_side=800, out_format="webp", quality=80)
-            img = Image.open(out)
-            assert max(img.size) <= 800
-            assert img.format == "WEBP"
+            with Image.open(out) as img:
+                assert max(img.size) <= 800
+                assert img.format == "WEBP"
 
     def test_real_images_crop_center(self, real_images_dir, output_dir):
         if real_images_dir is None:
@@ -421,5 +451,5 @@ class TestRealImages:
             out = process_image(
                 src, output_dir, width=400, height=400, do_crop_center=True,
             )
-            img = Image.open(out)
-            assert img.size == (400, 400)
+            with Image.open(out) as img:
+                assert img.size == (400, 400)